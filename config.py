@@ -17,17 +17,45 @@ FORMAT = "int16"
 # Wake/Sleep Words
 WAKE_WORD = "hi"  # Custom wake word - you can train custom models with Picovoice
 SLEEP_WORD = "bye"
+SLEEP_WORD_LOWER = SLEEP_WORD.lower()
+
+# Custom Porcupine keyword models for WAKE_WORD / SLEEP_WORD (train on Picovoice Console).
+# If either file is missing, the built-in "porcupine" keyword is used and the
+# sleep word is detected in Whisper transcripts instead.
+WAKE_WORD_MODEL_PATH = os.getenv("WAKE_WORD_MODEL_PATH", "hi.ppn")
+SLEEP_WORD_MODEL_PATH = os.getenv("SLEEP_WORD_MODEL_PATH", "bye.ppn")
 
 # Whisper Settings (Local Model)
 # Options: "tiny", "base", "small", "medium", "large"
 # tiny = fastest, least accurate | large = slowest, most accurate
 WHISPER_MODEL = "base"  # Good balance of speed and accuracy
+# Backends: "faster" (faster-whisper, default), "openai" (openai-whisper/PyTorch),
+# "onnx" (ONNX Runtime via optimum)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "faster")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "whisper-onnx")  # Optimized export, if present
+WHISPER_CPU_THREADS = max(1, (os.cpu_count() or 2) // 2)  # Leave cores free for audio/Porcupine
 
 # Recording Settings
 MAX_RECORDING_DURATION = 30  # seconds per chunk
 SILENCE_THRESHOLD = 500  # adjust based on environment
 SILENCE_DURATION = 2  # seconds of silence before processing
 
+# Voice Activity Detection (skip Whisper on silent windows)
+VAD_AGGRESSIVENESS = 2  # webrtcvad mode, 0 (least) - 3 (most aggressive)
+VAD_FRAME_MS = 30  # webrtcvad frame length: 10, 20 or 30 ms
+VAD_MIN_VOICED_RATIO = 0.25  # share of voiced frames required to transcribe
+
 # Real-time Transcription Settings
 REALTIME_CHUNK_DURATION = 2  # Process audio every 2 seconds for real-time feel
 MIN_AUDIO_LENGTH = 0.5  # Minimum audio length to transcribe (seconds)
+WINDOW_OVERLAP = 0.2  # Seconds of each window repeated at the start of the next
+
+# Batched Transcription Settings
+WHISPER_BATCH_SIZE = 8  # Max queued segments transcribed in one Whisper call
+# Queued segments are flushed as soon as processing catches up with capture, so
+# batches only grow while Whisper is behind; this caps how long one can wait
+BATCH_FLUSH_INTERVAL = REALTIME_CHUNK_DURATION
+# Captured chunks buffered while transcription runs: enough for a full batch of
+# windows, so a slow Whisper call produces a bigger next batch instead of drops
+AUDIO_QUEUE_SIZE = WHISPER_BATCH_SIZE * REALTIME_CHUNK_DURATION * SAMPLE_RATE // CHUNK_SIZE
+AUDIO_DROP_LOG_INTERVAL = 5  # Min seconds between "audio lost" warnings
@@ -1,14 +1,83 @@
 """Core Speech-to-Text module with wake/sleep word detection."""
-import pyaudio
+import sounddevice as sd
 import numpy as np
 import pvporcupine
-import whisper
+import ctranslate2
+import webrtcvad
+from numba import njit, prange
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 import wave
 import io
+import os
+import re
+import string
+from bisect import bisect_right
 import time
-from typing import Optional, Callable
+import queue
+import threading
+from typing import Optional, Callable, List, Literal
 import config
 
+# int16 -> float32 normalization factor (multiply instead of dividing by 32768)
+_INV32768 = np.float32(1.0 / 32768.0)
+
+# Greedy, single-pass decoding for short real-time windows
+_DECODE_OPTIONS = dict(
+    language="en",  # You can change or remove this for auto-detection
+    beam_size=1,
+    best_of=1,
+    temperature=0,
+    condition_on_previous_text=False,
+    no_speech_threshold=0.6,
+    compression_ratio_threshold=2.4,
+    without_timestamps=True,
+    vad_filter=False
+)
+
+# Same decoding strategy for the openai-whisper backend (greedy when temperature is 0)
+_OPENAI_DECODE_OPTIONS = dict(
+    language="en",
+    temperature=0,
+    condition_on_previous_text=False,
+    no_speech_threshold=0.6,
+    compression_ratio_threshold=2.4,
+    without_timestamps=True
+)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def i16_to_f32(src, dst):
+    """Convert int16 PCM to normalized float32 in a single fused pass."""
+    for i in prange(src.size):
+        dst[i] = src[i] * _INV32768
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def i16_rms(src):
+    """Root-mean-square level of int16 PCM, in int16 units."""
+    acc = 0.0
+    for i in prange(src.size):
+        sample = np.float64(src[i])
+        acc += sample * sample
+    return np.sqrt(acc / src.size)
+
+
+def _drop_repeated_prefix(previous: str, text: str) -> str:
+    """
+    Drop the first word of `text` if it repeats the last word of `previous`.
+    
+    The 200 ms window overlap holds at most one word. Only words are compared,
+    not timing, so a genuine repetition across the boundary ("no" | "no more")
+    loses one copy too.
+    """
+    words = text.split()
+    previous_words = previous.split()
+    if (words and previous_words and
+            words[0].strip(string.punctuation).lower() ==
+            previous_words[-1].strip(string.punctuation).lower()):
+        return " ".join(words[1:])
+    return text
+
 
 class STTModule:
     """Speech-to-Text module with wake/sleep word detection."""
@@ -16,101 +85,461 @@ class STTModule:
     def __init__(self, 
                  picovoice_key: str = None,
                  whisper_model: str = None,
-                 on_transcript: Callable[[str], None] = None):
+                 on_transcript: Callable[[str], None] = None,
+                 whisper_backend: Literal["openai", "faster", "onnx"] = None):
         
         self.picovoice_key = picovoice_key or config.PICOVOICE_ACCESS_KEY
         self.whisper_model_name = whisper_model or config.WHISPER_MODEL
+        self.whisper_backend = whisper_backend or config.WHISPER_BACKEND
         self.on_transcript = on_transcript
+        self._sleep_re = re.compile(rf"\b{re.escape(config.SLEEP_WORD_LOWER)}\b")
         
-        # Load Whisper model
-        self.whisper_model = whisper.load_model(self.whisper_model_name)
-
+        # Load Whisper model in the background; wake word listening doesn't need it
+        self.whisper_model = None
+        self._backend = None  # (audio_np, segment_lengths) -> per-segment texts, set once loaded
+        self._model_ready = threading.Event()
         
         # Audio setup
-        self.audio = pyaudio.PyAudio()
         self.stream = None
         
+        # Audio callback hands raw chunks to a single processing thread
+        self._audio_queue = queue.Queue(maxsize=config.AUDIO_QUEUE_SIZE)
+        self._worker = None
+        self._stop_event = threading.Event()
+        
+        # Lost-audio counters, bumped on the callback thread and reported by the worker
+        self._drop_lock = threading.Lock()
+        self._dropped_chunks = 0
+        self._input_overflows = 0
+        self._last_drop_report = 0.0
+        
         # State
         self.is_active = False
         self.is_listening = False
-        self.audio_buffer = []
+        self.pending_segments: List[np.ndarray] = []
+        self._pending_follows: List[bool] = []  # Segment overlaps the one before it
+        self._pending_since = None
+        
+        # Trailing samples carried into the next window so boundary words aren't split
+        self._overlap_samples = int(config.WINDOW_OVERLAP * config.SAMPLE_RATE)
+        self._carried = 0
+        self._last_text = ""
+        
+        # Preallocated int16 ring buffer for the current real-time window
+        self._ring = np.empty(
+            config.SAMPLE_RATE * (config.REALTIME_CHUNK_DURATION + 1) + self._overlap_samples,
+            dtype=np.int16
+        )
+        self._write = 0
+        
+        # Float32 staging buffer for Whisper input (the silence check reads the
+        # int16 ring directly); queued segments are consecutive views into it
+        self._scratch_f32 = np.empty(
+            config.MAX_RECORDING_DURATION * config.SAMPLE_RATE,
+            dtype=np.float32
+        )
+        self._f32_write = 0
+        # JIT-compile the kernels now, not on the first window
+        i16_to_f32(self._ring[:1], self._scratch_f32[:1])
+        i16_rms(self._ring[:1])
+        
+        # Voice activity detector for windows that pass the energy gate
+        self._vad = webrtcvad.Vad(config.VAD_AGGRESSIVENESS)
+        self._vad_frame_len = config.SAMPLE_RATE * config.VAD_FRAME_MS // 1000
         
         # Porcupine wake word detector
         self.porcupine = None
         self._init_porcupine()
+        
+        # Start loading Whisper last, so a failed __init__ doesn't leave a loader running
+        threading.Thread(target=self._load_whisper, daemon=True).start()
     
-    def _init_porcupine(self):
-        """Initialize Porcupine wake word detector."""
+    def _load_whisper(self):
+        """Load and warm up the Whisper backend (runs on a background thread)."""
+        loaders = {
+            "faster": self._load_faster_whisper,
+            "openai": self._load_openai_whisper,
+            "onnx": self._load_onnx_whisper
+        }
         try:
-            # Using built-in keywords - "porcupine" or you can use custom trained models
-            # For custom wake words, you need to train them on Picovoice Console
-            self.porcupine = pvporcupine.create(
-                access_key=self.picovoice_key,
-                keywords=["porcupine"]  # Built-in keyword, change to custom model path for "hi"
+            if self.whisper_backend not in loaders:
+                raise ValueError(f"Unknown Whisper backend: {self.whisper_backend}")
+            loaders[self.whisper_backend]()
+        except Exception as e:
+            print(f"Error: Could not load Whisper model: {e}")
+        finally:
+            self._model_ready.set()
+    
+    def _load_faster_whisper(self):
+        """Load faster-whisper (CTranslate2) with batched inference."""
+        # CTranslate2: fp16 on CUDA, int8 on CPU
+        if ctranslate2.get_cuda_device_count() > 0:
+            self.device, self.compute_type = "cuda", "float16"
+        else:
+            self.device, self.compute_type = "cpu", "int8"
+        model_kwargs = dict(
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=config.WHISPER_CPU_THREADS
+        )
+        try:
+            # Use the cached weights directly to skip the Hugging Face Hub lookup
+            model = WhisperModel(self.whisper_model_name, local_files_only=True, **model_kwargs)
+        except FileNotFoundError:
+            model = WhisperModel(self.whisper_model_name, **model_kwargs)
+        
+        # Warm up so model setup cost stays off the hot path
+        segments, _ = model.transcribe(
+            np.zeros(config.SAMPLE_RATE, dtype=np.float32),
+            **_DECODE_OPTIONS
+        )
+        list(segments)  # Segments are lazy; consume them to actually run the model
+        
+        batched_model = BatchedInferencePipeline(model=model)
+        
+        def transcribe(audio_np, segment_lengths):
+            # Describe each segment's position within the audio
+            clip_timestamps = []
+            offset = 0.0
+            for length in segment_lengths:
+                end = offset + length / config.SAMPLE_RATE
+                clip_timestamps.append({"start": offset, "end": end})
+                offset = end
+            
+            results, _ = batched_model.transcribe(
+                audio_np,
+                batch_size=config.WHISPER_BATCH_SIZE,
+                clip_timestamps=clip_timestamps,
+                **_DECODE_OPTIONS
+            )
+            
+            # Map each result back to the clip it started in
+            starts = [clip["start"] for clip in clip_timestamps]
+            texts = [""] * len(segment_lengths)
+            for result in results:
+                index = max(bisect_right(starts, result.start + 1e-3) - 1, 0)
+                texts[index] += result.text
+            return texts
+        
+        self.whisper_model = model
+        self._backend = transcribe
+    
+    def _load_openai_whisper(self):
+        """Load the reference openai-whisper (PyTorch) model."""
+        import torch
+        import whisper
+        
+        torch.set_num_threads(config.WHISPER_CPU_THREADS)
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.fp16 = self.device == "cuda"
+        model = whisper.load_model(self.whisper_model_name, device=self.device, in_memory=True)
+        
+        # On CPU, run the Linear layers (attention/FFN projections) as int8 GEMMs;
+        # LayerNorm and Conv stay FP32
+        if self.device == "cpu":
+            for module in model.modules():
+                # whisper's Linear subclass only adds dtype casting, and
+                # quantize_dynamic matches exact module types
+                if isinstance(module, torch.nn.Linear):
+                    module.__class__ = torch.nn.Linear
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
             )
+        
+        # Warm up so model setup cost stays off the hot path
+        model.transcribe(
+            np.zeros(config.SAMPLE_RATE, dtype=np.float32),
+            fp16=self.fp16,
+            **_OPENAI_DECODE_OPTIONS
+        )
+        
+        # On CUDA, stage audio through reusable pinned host + device buffers so the
+        # H2D copy is async and the mel spectrogram is computed on the GPU
+        if self.device == "cuda":
+            max_samples = config.MAX_RECORDING_DURATION * config.SAMPLE_RATE
+            pinned = torch.empty(max_samples, dtype=torch.float32, pin_memory=True)
+            gpu = torch.empty_like(pinned, device="cuda")
+        
+        def transcribe(audio_np, segment_lengths):
+            audio = audio_np
+            if self.device == "cuda":
+                n = len(audio_np)
+                pinned[:n].copy_(torch.from_numpy(audio_np))
+                # Safe to reuse next call: transcribe() syncs on the decoded tokens
+                gpu[:n].copy_(pinned[:n], non_blocking=True)
+                audio = gpu[:n]
+            
+            # No batched decoding here; segments are transcribed one after another
+            texts = []
+            offset = 0
+            for length in segment_lengths:
+                result = model.transcribe(
+                    audio[offset:offset + length],
+                    fp16=self.fp16,
+                    **_OPENAI_DECODE_OPTIONS
+                )
+                texts.append(result["text"])
+                offset += length
+            return texts
+        
+        self.whisper_model = model
+        self._backend = transcribe
+    
+    def _load_onnx_whisper(self):
+        """Load an ONNX Runtime export of Whisper (fused attention kernels)."""
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+        from optimum.pipelines import pipeline
+        from transformers import AutoProcessor
+        
+        # Prefer a pre-optimized export; otherwise export the Hub model on the fly
+        if os.path.isdir(config.ONNX_MODEL_DIR):
+            model_id, export = config.ONNX_MODEL_DIR, False
+        else:
+            model_id, export = f"openai/whisper-{self.whisper_model_name}", True
+        model = ORTModelForSpeechSeq2Seq.from_pretrained(
+            model_id,
+            export=export,
+            provider="CPUExecutionProvider"
+        )
+        processor = AutoProcessor.from_pretrained(model_id)
+        asr = pipeline(
+            "automatic-speech-recognition",
+            model=model,
+            tokenizer=processor.tokenizer,
+            feature_extractor=processor.feature_extractor
+        )
+        generate_kwargs = {"language": "en", "task": "transcribe"}
+        
+        # Warm up so session setup cost stays off the hot path
+        asr(np.zeros(config.SAMPLE_RATE, dtype=np.float32), generate_kwargs=generate_kwargs)
+        
+        def transcribe(audio_np, segment_lengths):
+            # One pipeline input per segment so they are decoded as a batch
+            segments = []
+            offset = 0
+            for length in segment_lengths:
+                segments.append(audio_np[offset:offset + length])
+                offset += length
+            results = asr(
+                segments,
+                batch_size=config.WHISPER_BATCH_SIZE,
+                generate_kwargs=generate_kwargs
+            )
+            return [result["text"] for result in results]
+        
+        self.whisper_model = model
+        self._backend = transcribe
+    
+    def _init_porcupine(self):
+        """Initialize Porcupine wake (and, if available, sleep) word detector."""
+        self._porcupine_sleep = False
+        
+        # Custom "hi"/"bye" models (trained on Picovoice Console) handle both
+        # keywords: index 0 = wake, index 1 = sleep
+        if (os.path.exists(config.WAKE_WORD_MODEL_PATH) and
+                os.path.exists(config.SLEEP_WORD_MODEL_PATH)):
+            try:
+                self.porcupine = pvporcupine.create(
+                    access_key=self.picovoice_key,
+                    keyword_paths=[config.WAKE_WORD_MODEL_PATH, config.SLEEP_WORD_MODEL_PATH]
+                )
+                self._porcupine_sleep = True
+            except Exception as e:
+                print(f"Warning: Could not load custom keyword models: {e}")
+                print("Falling back to the built-in 'porcupine' wake word.")
+        
+        try:
+            if self.porcupine is None:
+                # Built-in "porcupine" keyword; sleep word via Whisper
+                self.porcupine = pvporcupine.create(
+                    access_key=self.picovoice_key,
+                    keywords=["porcupine"]
+                )
         except Exception as e:
             print(f"Warning: Could not initialize Porcupine: {e}")
             print("Wake word detection will be disabled. Use manual activation.")
             self.porcupine = None
+            return
+        
+        # Audio chunks are fed to Porcupine as-is, so sizes must match exactly
+        if config.CHUNK_SIZE != self.porcupine.frame_length:
+            raise ValueError(
+                f"CHUNK_SIZE ({config.CHUNK_SIZE}) must equal Porcupine frame length "
+                f"({self.porcupine.frame_length})"
+            )
+        self._fb = np.frombuffer
     
     def start_listening(self):
         """Start the audio stream for listening."""
         if self.stream is None:
-            self.stream = self.audio.open(
-                format=pyaudio.paInt16,
+            self._audio_queue = queue.Queue(maxsize=config.AUDIO_QUEUE_SIZE)
+            self.stream = sd.RawInputStream(
+                samplerate=config.SAMPLE_RATE,
+                blocksize=config.CHUNK_SIZE,
                 channels=config.CHANNELS,
-                rate=config.SAMPLE_RATE,
-                input=True,
-                frames_per_buffer=config.CHUNK_SIZE
+                dtype=config.FORMAT,
+                latency="low",
+                callback=self._audio_cb
+            )
+            self._worker = threading.Thread(
+                target=self._process_loop, args=(self._audio_queue,), daemon=True
             )
+            self._worker.start()
+            self.stream.start()
         self.is_listening = True
+        self._stop_event.clear()
+    
+    def _audio_cb(self, indata, frames, time_info, status):
+        """Queue one captured block (runs on the PortAudio callback thread)."""
+        if status.input_overflow:
+            with self._drop_lock:
+                self._input_overflows += 1
+        try:
+            self._audio_queue.put_nowait(bytes(indata))
+        except queue.Full:
+            # Processing is too far behind; drop the chunk rather than block the callback
+            with self._drop_lock:
+                self._dropped_chunks += 1
+    
+    def _report_audio_drops(self, force: bool = False):
+        """Log audio lost since the last report (at most once per AUDIO_DROP_LOG_INTERVAL)."""
+        now = time.time()
+        if not force and now - self._last_drop_report < config.AUDIO_DROP_LOG_INTERVAL:
+            return
+        self._last_drop_report = now
+        
+        with self._drop_lock:
+            dropped, overflows = self._dropped_chunks, self._input_overflows
+            self._dropped_chunks = self._input_overflows = 0
+        if dropped:
+            lost = dropped * config.CHUNK_SIZE / config.SAMPLE_RATE
+            print(f"Warning: dropped {dropped} audio chunks ({lost:.1f}s) - processing is behind")
+        if overflows:
+            print(f"Warning: {overflows} audio input overflows - samples lost before capture")
+    
+    def _process_loop(self, audio_queue: queue.Queue):
+        """
+        Consume captured chunks until the None sentinel arrives.
+        
+        Args:
+            audio_queue: Queue filled by the audio callback for this stream
+        """
+        while True:
+            if self._worker is not threading.current_thread() and audio_queue.empty():
+                # stop_listening() ran on this thread (from a callback) and the
+                # stream is closed, so this is the last of the audio
+                audio_chunk = None
+            else:
+                # Wake up for the flush deadline even if no audio arrives
+                timeout = None
+                if self.pending_segments:
+                    timeout = max(
+                        self._pending_since + config.BATCH_FLUSH_INTERVAL - time.time(), 0
+                    )
+                try:
+                    audio_chunk = audio_queue.get(timeout=timeout)
+                except queue.Empty:
+                    audio_chunk = b""
+            self._report_audio_drops(force=audio_chunk is None)
+            
+            try:
+                if audio_chunk is None:
+                    # Stopping: transcribe whatever is still buffered or queued
+                    if self.is_active:
+                        self._process_buffer()
+                    self._flush_pending()
+                    break
+                if audio_chunk:
+                    self.process_audio_chunk(audio_chunk)
+                self._flush_if_due()
+            except Exception as e:
+                # Keep the worker alive; one bad chunk or callback shouldn't stop processing
+                print(f"Audio processing error: {e}")
+                if audio_chunk is None:
+                    break
     
     def stop_listening(self):
-        """Stop the audio stream."""
+        """
+        Stop the audio stream.
+        
+        Already captured audio is still transcribed before the worker exits.
+        Safe to call from `on_transcript`; the worker then finishes on its own
+        instead of being joined.
+        """
         self.is_listening = False
+        self._stop_event.set()
         if self.stream:
-            self.stream.stop_stream()
+            self.stream.stop()
             self.stream.close()
             self.stream = None
+            
+            if self._worker is threading.current_thread():
+                # Can't join ourselves; _process_loop exits once the queue is drained
+                self._worker = None
+                return
+            
+            # No more callbacks can arrive; let the worker drain the queue and exit.
+            # Never block on a full queue if the worker is no longer consuming it.
+            while self._worker.is_alive():
+                try:
+                    self._audio_queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self._worker.join()
+            self._worker = None
     
     def activate(self):
         """Activate STT (wake word detected)."""
         self.is_active = True
-        self.audio_buffer = []
+        self._write = 0
+        self._carried = 0
+        self._last_text = ""
+        self._f32_write = 0
+        self.pending_segments = []
+        self._pending_follows = []
+        self._pending_since = None
         print("🎤 STT Activated - Start speaking...")
     
     def deactivate(self):
         """Deactivate STT (sleep word detected)."""
         self.is_active = False
-        self.audio_buffer = []
+        self._write = 0
+        self._carried = 0
+        self._last_text = ""
+        self._f32_write = 0
+        self.pending_segments = []
+        self._pending_follows = []
+        self._pending_since = None
         print("💤 STT Deactivated")
     
-    def detect_wake_word(self, audio_chunk: bytes) -> bool:
+    def detect_keyword(self, audio_chunk: bytes) -> int:
         """
-        Detect wake word in audio chunk.
+        Detect wake/sleep keyword in audio chunk.
         
         Args:
             audio_chunk: Raw audio bytes
             
         Returns:
-            True if wake word detected
+            Keyword index (0 = wake, 1 = sleep) or -1 if none detected
         """
         if self.porcupine is None:
-            return False
+            return -1
         
-        try:
-            # Convert bytes to int16 array
-            pcm = np.frombuffer(audio_chunk, dtype=np.int16)
-            
-            # Porcupine expects specific frame length
-            if len(pcm) >= self.porcupine.frame_length:
-                pcm = pcm[:self.porcupine.frame_length]
-                keyword_index = self.porcupine.process(pcm)
-                return keyword_index >= 0
-        except Exception as e:
-            print(f"Wake word detection error: {e}")
+        # Chunk length equals frame length (checked at init), so pass the view directly
+        return self.porcupine.process(self._fb(audio_chunk, dtype=np.int16))
+    
+    def detect_wake_word(self, audio_chunk: bytes) -> bool:
+        """
+        Detect wake word in audio chunk.
         
-        return False
+        Args:
+            audio_chunk: Raw audio bytes
+            
+        Returns:
+            True if wake word detected
+        """
+        return self.detect_keyword(audio_chunk) == 0
     
     def detect_sleep_word(self, text: str) -> bool:
         """
@@ -122,30 +551,50 @@ class STTModule:
         Returns:
             True if sleep word detected
         """
-        return config.SLEEP_WORD.lower() in text.lower()
+        return self._sleep_re.search(text.lower()) is not None
     
-    def transcribe_audio(self, audio_data: bytes) -> Optional[str]:
+    def transcribe_audio(self, audio_np: np.ndarray,
+                         segment_lengths: Optional[List[int]] = None,
+                         segment_follows: Optional[List[bool]] = None) -> Optional[str]:
         """
-        Transcribe audio using local Whisper model.
+        Transcribe audio segments in a single batched Whisper call.
+        
+        Consecutive windows overlap, so a word repeated from the end of the
+        previous segment's transcript is dropped when the segment follows it.
         
         Args:
-            audio_data: Raw audio bytes
+            audio_np: Float32 audio, segments laid out back to back in capture order
+            segment_lengths: Sample count of each segment (whole array if None)
+            segment_follows: Whether each segment overlaps the previously
+                transcribed one (no deduplication if None)
             
         Returns:
             Transcribed text or None
         """
+        # Block until the background load finishes (only the first time)
+        if self._backend is None:
+            self._model_ready.wait()
+            if self._backend is None:
+                return None
+        
         try:
-            # Convert bytes to numpy array
-            audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+            # Transcribe using the configured local Whisper backend
+            segment_lengths = segment_lengths or [len(audio_np)]
+            texts = self._backend(audio_np, segment_lengths)
+            follows = segment_follows or [False] * len(segment_lengths)
             
-            # Transcribe using local Whisper
-            result = self.whisper_model.transcribe(
-                audio_np,
-                language="en",  # You can change or remove this for auto-detection
-                fp16=False  # Set to True if you have CUDA GPU
-            )
+            parts = []
+            for segment_text, segment_follows_previous in zip(texts, follows):
+                segment_text = segment_text.strip()
+                previous = self._last_text if segment_follows_previous else ""
+                self._last_text = segment_text
+                if not segment_text:
+                    continue
+                deduped = _drop_repeated_prefix(previous, segment_text)
+                if deduped:
+                    parts.append(deduped)
             
-            text = result["text"].strip()
+            text = " ".join(parts)
             return text if text else None
         
         except Exception as e:
@@ -159,69 +608,177 @@ class STTModule:
         Args:
             audio_chunk: Raw audio bytes
         """
-        # Check for wake word if not active
-        if not self.is_active:
-            if self.detect_wake_word(audio_chunk):
-                self.activate()
-            return
-        
-        # If active, accumulate audio
-        self.audio_buffer.append(audio_chunk)
+        # Run Porcupine while inactive (wake word) or, with a sleep model, while active
+        if not self.is_active or self._porcupine_sleep:
+            try:
+                keyword_index = self.detect_keyword(audio_chunk)
+            except Exception as e:
+                print(f"Keyword detection error: {e}")
+                keyword_index = -1
+            
+            if not self.is_active:
+                if keyword_index == 0:
+                    self.activate()
+                return
+            
+            if keyword_index == 1:
+                # Transcribe what was said before the sleep word, then stop
+                self._process_buffer()
+                self._flush_pending()
+                self.deactivate()
+                return
         
-        # Process buffer when it reaches a certain size (real-time: every 2 seconds)
-        buffer_duration = len(self.audio_buffer) * config.CHUNK_SIZE / config.SAMPLE_RATE
+        # If active, copy samples straight into the ring buffer
+        frame = np.frombuffer(audio_chunk, dtype=np.int16)
+        self._ring[self._write:self._write + len(frame)] = frame
+        self._write += len(frame)
         
-        if buffer_duration >= config.REALTIME_CHUNK_DURATION:
+        # Process buffer when it reaches a certain size (real-time: every 2 seconds of new audio)
+        if (self._write - self._carried) / config.SAMPLE_RATE >= config.REALTIME_CHUNK_DURATION:
             self._process_buffer()
     
+    def _is_speech(self, pcm: np.ndarray) -> bool:
+        """
+        Check whether a window contains speech worth transcribing.
+        
+        Args:
+            pcm: Int16 audio samples
+            
+        Returns:
+            True if the window is loud enough and enough frames are voiced
+        """
+        # Cheap energy gate first
+        if i16_rms(pcm) < config.SILENCE_THRESHOLD:
+            return False
+        
+        # Then require a minimum share of voiced VAD frames
+        n_frames = len(pcm) // self._vad_frame_len
+        if n_frames == 0:
+            return False
+        voiced = 0
+        for i in range(n_frames):
+            frame = pcm[i * self._vad_frame_len:(i + 1) * self._vad_frame_len]
+            if self._vad.is_speech(frame.tobytes(), config.SAMPLE_RATE):
+                voiced += 1
+        return voiced / n_frames >= config.VAD_MIN_VOICED_RATIO
+    
     def _process_buffer(self):
         """Process accumulated audio buffer."""
-        if not self.audio_buffer:
-            return
+        n_samples = self._write
+        if n_samples == self._carried:
+            return  # Nothing new since the last window
         
-        # Combine audio chunks
-        audio_data = b''.join(self.audio_buffer)
-        self.audio_buffer = []
+        queued = self._queue_window(n_samples)
         
+        # Rejected (silent) windows must still let the oldest queued segment go out
+        self._flush_if_due()
+        
+        if not self.is_active:
+            return  # The sleep word ended STT
+        if queued:
+            # Carry the window's tail into the next one
+            tail = min(self._overlap_samples, n_samples)
+            self._ring[:tail] = self._ring[n_samples - tail:n_samples]
+            self._write = self._carried = tail
+        else:
+            # Nothing to overlap with: the next window starts fresh
+            self._write = self._carried = 0
+            self._last_text = ""
+    
+    def _queue_window(self, n_samples: int) -> bool:
+        """
+        Convert the ring window and queue it for batched transcription.
+        
+        Args:
+            n_samples: Number of samples in the ring window
+            
+        Returns:
+            True if the window was queued, False if it was rejected
+        """
         # Check if audio is long enough
-        duration = len(audio_data) / (config.SAMPLE_RATE * 2)  # 2 bytes per sample (int16)
+        duration = n_samples / config.SAMPLE_RATE
         if duration < config.MIN_AUDIO_LENGTH:
+            return False
+        
+        # Skip silent windows entirely - no conversion or decoder pass needed
+        if not self._is_speech(self._ring[:n_samples]):
+            return False
+        
+        # Make room in the scratch buffer if this window would not fit
+        if self._f32_write + n_samples > len(self._scratch_f32):
+            self._flush_pending()
+            if not self.is_active:
+                return False  # The flushed batch contained the sleep word
+        
+        # Convert the ring view in place into the scratch buffer (zero-copy view)
+        audio_np = self._scratch_f32[self._f32_write:self._f32_write + n_samples]
+        i16_to_f32(self._ring[:n_samples], audio_np)
+        
+        if not self.pending_segments:
+            self._pending_since = time.time()
+        self.pending_segments.append(audio_np)
+        self._pending_follows.append(self._carried > 0)  # Only set after a queued window
+        self._f32_write += n_samples
+        
+        # Flush as soon as the batch is full; otherwise see _flush_if_due
+        if len(self.pending_segments) >= config.WHISPER_BATCH_SIZE:
+            self._flush_pending()
+        return True
+    
+    def _flush_if_due(self):
+        """Flush queued segments once processing has caught up or the oldest has waited too long."""
+        if not self.pending_segments:
+            return
+        # An empty audio queue means no more windows are about to join this batch
+        if (self._audio_queue.empty() or
+                time.time() - self._pending_since >= config.BATCH_FLUSH_INTERVAL):
+            self._flush_pending()
+    
+    def _flush_pending(self):
+        """Transcribe all queued segments in one batch."""
+        if not self.pending_segments:
             return
         
+        segment_lengths = [len(segment) for segment in self.pending_segments]
+        segment_follows = self._pending_follows
+        audio_np = self._scratch_f32[:self._f32_write]
+        self.pending_segments = []
+        self._pending_follows = []
+        self._pending_since = None
+        self._f32_write = 0  # Scratch is reused only after this synchronous call returns
+        
         # Transcribe
-        text = self.transcribe_audio(audio_data)
+        text = self.transcribe_audio(audio_np, segment_lengths, segment_follows)
         
         if text:
-            # Check for sleep word
-            if self.detect_sleep_word(text):
+            # Check for sleep word (only when Porcupine isn't listening for it)
+            if not self._porcupine_sleep and self.detect_sleep_word(text):
                 self.deactivate()
             
             # Callback with transcription (real-time!)
             if self.on_transcript:
                 self.on_transcript(text)
     
+    def stop(self):
+        """Ask a running `run()` call to return (safe from any thread)."""
+        self._stop_event.set()
+    
     def run(self, duration: Optional[int] = None):
         """
         Run the STT module.
         
+        Audio is processed on a background thread, so `on_transcript` is
+        called from that thread while this one just waits.
+        
         Args:
             duration: Optional duration in seconds (None for infinite)
         """
         self.start_listening()
-        start_time = time.time()
         
         print("Listening for wake word...")
         
         try:
-            while self.is_listening:
-                # Check duration
-                if duration and (time.time() - start_time) > duration:
-                    break
-                
-                # Read audio chunk
-                if self.stream:
-                    audio_chunk = self.stream.read(config.CHUNK_SIZE, exception_on_overflow=False)
-                    self.process_audio_chunk(audio_chunk)
+            self._stop_event.wait(timeout=duration or None)
         
         except KeyboardInterrupt:
             print("\n⚠️ Interrupted by user")
@@ -234,4 +791,3 @@ class STTModule:
         self.stop_listening()
         if self.porcupine:
             self.porcupine.delete()
-        self.audio.terminate()